@@ -1,11 +1,20 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import re
+import asyncio
 import logging
 import secrets
+import hashlib
+import hmac
+import base64
+import threading
+import time
 import string
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -13,6 +22,8 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
+import orjson
+from cachetools import TTLCache
 from passlib.context import CryptContext
 
 ROOT_DIR = Path(__file__).parent
@@ -20,19 +31,41 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(
+    mongo_url,
+    tz_aware=True,
+    tzinfo=timezone.utc,
+    maxPoolSize=200,
+    minPoolSize=20,
+    serverSelectionTimeoutMS=3000,
+    waitQueueTimeoutMS=2000
+)
 db = client[os.environ['DB_NAME']]
 
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'tempmail-secret-key-change-in-production')
+JWT_SECRET_KEY = JWT_SECRET.encode()
 JWT_ALGORITHM = "HS256"
 CODE_EXPIRY_HOURS = 12
 
+# Attempts at inserting a generated code before giving up on collisions
+CODE_INSERT_ATTEMPTS = 3
+DUPLICATE_KEY_ERROR = 11000
+
+# How long expired codes, emails and messages are kept before MongoDB deletes them
+EXPIRED_RETENTION_SECONDS = 24 * 60 * 60
+
+# Verified token cache (keyed by SHA-256 of the raw token)
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 5
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Create the main app
-app = FastAPI(title="TempMail SaaS API")
+app = FastAPI(title="TempMail SaaS API", default_response_class=ORJSONResponse)
 
 # Create routers
 api_router = APIRouter(prefix="/api")
@@ -45,7 +78,7 @@ class VerifyCodeRequest(BaseModel):
 
 class VerifyCodeResponse(BaseModel):
     token: str
-    expires_at: str
+    expires_at: datetime
     email_address: str
 
 class AdminLoginRequest(BaseModel):
@@ -59,19 +92,23 @@ class AdminLoginResponse(BaseModel):
 class GenerateCodeRequest(BaseModel):
     expiry_hours: int = CODE_EXPIRY_HOURS
 
+class GenerateCodesRequest(BaseModel):
+    count: int = Field(ge=1, le=100)
+    expiry_hours: int = CODE_EXPIRY_HOURS
+
 class AccessCodeResponse(BaseModel):
     id: str
     code: str
-    expires_at: str
+    expires_at: datetime
     used: bool
-    used_at: Optional[str] = None
-    created_at: str
+    used_at: Optional[datetime] = None
+    created_at: datetime
 
 class TempEmailResponse(BaseModel):
     id: str
     email_address: str
-    created_at: str
-    expires_at: str
+    created_at: datetime
+    expires_at: datetime
 
 class EmailMessageResponse(BaseModel):
     id: str
@@ -79,7 +116,7 @@ class EmailMessageResponse(BaseModel):
     from_email: str
     subject: str
     body: str
-    received_at: str
+    received_at: datetime
     is_read: bool = False
 
 class MockEmailRequest(BaseModel):
@@ -88,6 +125,12 @@ class MockEmailRequest(BaseModel):
     subject: str
     body: str
 
+# Projections limiting list queries to the fields their response models expose,
+# so those endpoints can return documents without revalidating them
+TEMP_EMAIL_PROJECTION = {"_id": 0, **dict.fromkeys(TempEmailResponse.model_fields, 1)}
+EMAIL_MESSAGE_PROJECTION = {"_id": 0, **dict.fromkeys(EmailMessageResponse.model_fields, 1)}
+ACCESS_CODE_PROJECTION = {"_id": 0, **dict.fromkeys(AccessCodeResponse.model_fields, 1)}
+
 class StatsResponse(BaseModel):
     total_codes: int
     active_codes: int
@@ -98,15 +141,39 @@ class StatsResponse(BaseModel):
 
 # ============ HELPERS ============
 
+_CODE_CHARS = (string.ascii_uppercase + string.digits).encode()
+_CODE_BYTE_LIMIT = 256 - 256 % len(_CODE_CHARS)
+# Shape of codes produced by generate_code()
+_CODE_RE = re.compile(r"[A-Z0-9]{8}")
+
 def generate_code(length: int = 8) -> str:
     """Generate alphanumeric access code"""
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(length))
+    code = bytearray()
+    while len(code) < length:
+        # Reject bytes above the last full multiple of the charset size to avoid modulo bias
+        code.extend(
+            _CODE_CHARS[b % len(_CODE_CHARS)]
+            for b in secrets.token_bytes(length)
+            if b < _CODE_BYTE_LIMIT
+        )
+    return code[:length].decode()
 
 def generate_email_address() -> str:
     """Generate temporary email address"""
-    prefix = ''.join(secrets.choice(string.ascii_lowercase + string.digits) for _ in range(10))
-    return f"{prefix}@tempmail.local"
+    return f"{secrets.token_hex(8)}@tempmail.local"
+
+def build_code_doc(created_at: datetime, expiry_hours: int, created_by: str) -> dict:
+    """Build a new, unused access code document"""
+    return {
+        "id": str(uuid.uuid4()),
+        "code": generate_code(),
+        "expires_at": created_at + timedelta(hours=expiry_hours),
+        "used": False,
+        "used_at": None,
+        "used_ips": [],
+        "created_at": created_at,
+        "created_by": created_by
+    }
 
 def get_client_ip(request: Request) -> str:
     """Extract client IP from request"""
@@ -130,10 +197,57 @@ def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def _b64url_decode(segment: str) -> bytes:
+    """Decode an unpadded base64url JWT segment"""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def decode_token(token: str) -> dict:
+    """Decode and verify an HS256 JWT issued by create_token.
+    
+    Verifies the signature with hmac/hashlib (OpenSSL) directly, avoiding
+    PyJWT's per-call key preparation and generic claim handling.
+    """
+    if token.count(".") != 2:
+        raise jwt.DecodeError("Not enough segments")
+    signing_input, _, signature_segment = token.rpartition(".")
+    header_segment, _, payload_segment = signing_input.partition(".")
+    
+    try:
+        header = orjson.loads(_b64url_decode(header_segment))
+        signature = _b64url_decode(signature_segment)
+    except ValueError:
+        raise jwt.DecodeError("Invalid header or signature")
+    if not isinstance(header, dict) or header.get("alg") != JWT_ALGORITHM:
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    
+    expected = hmac.new(JWT_SECRET_KEY, signing_input.encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    try:
+        payload = orjson.loads(_b64url_decode(payload_segment))
+    except ValueError:
+        raise jwt.DecodeError("Invalid payload")
+    exp = payload.get("exp") if isinstance(payload, dict) else None
+    if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+        raise jwt.MissingRequiredClaimError("exp")
+    if exp <= time.time():
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    return payload
+
 def verify_token(token: str) -> dict:
-    """Verify JWT token"""
+    """Verify JWT token, reusing recently verified payloads"""
+    key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
+        # Only successfully verified tokens are cached
+        with _token_cache_lock:
+            _token_cache[key] = payload
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Session expired")
@@ -154,22 +268,82 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
         raise HTTPException(status_code=403, detail="Admin access required")
     return payload
 
-# ============ INIT ADMIN ============
+# ============ STARTUP ============
 
 @app.on_event("startup")
 async def init_admin():
     """Create default admin if not exists"""
     admin = await db.admin_users.find_one({"username": "admin@botsmith.com"})
     if not admin:
-        hashed = pwd_context.hash("admin123")
+        hashed = await asyncio.to_thread(pwd_context.hash, "admin123")
         await db.admin_users.insert_one({
             "id": str(uuid.uuid4()),
             "username": "admin@botsmith.com",
             "password_hash": hashed,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         })
         logging.info("Default admin created: admin@botsmith.com / admin123")
 
+@app.on_event("startup")
+async def init_indexes():
+    """Create indexes for hot query paths (idempotent)"""
+    await db.access_codes.create_index("id", unique=True)
+    await db.access_codes.create_index("code", unique=True)
+    # Drop indexes that earlier deployments created but no query uses any more:
+    # get_stats counts codes with a single $facet pass, which cannot use
+    # (used, expires_at), and get_all_codes now sorts on (created_at, id)
+    existing_indexes = await db.access_codes.index_information()
+    for name in ("used_1_expires_at_1", "created_at_-1"):
+        if name in existing_indexes:
+            await db.access_codes.drop_index(name)
+    await db.access_codes.create_index([("created_at", -1), ("id", -1)])
+    # Also serves session_id-only lookups; covers verify_code's session lookup
+    await db.temp_emails.create_index([("session_id", 1), ("client_ip", 1), ("email_address", 1)])
+    await db.temp_emails.create_index("email_address", unique=True)
+    await db.email_messages.create_index("id", unique=True)
+    await db.email_messages.create_index([("session_id", 1), ("received_at", -1)])
+    # Let MongoDB purge expired documents once the retention window has passed
+    for collection in (db.access_codes, db.temp_emails, db.email_messages):
+        await collection.create_index("expires_at", expireAfterSeconds=EXPIRED_RETENTION_SECONDS)
+
+# Timestamp fields that earlier versions stored as ISO-8601 strings
+LEGACY_DATE_FIELDS = {
+    "access_codes": ("expires_at", "created_at", "used_at"),
+    "temp_emails": ("expires_at", "created_at"),
+    "email_messages": ("received_at",),
+    "admin_users": ("created_at",),
+}
+
+@app.on_event("startup")
+async def migrate_legacy_documents():
+    """Bring documents written by earlier versions up to the current schema (idempotent)"""
+    # Timestamps used to be stored as ISO-8601 strings
+    for collection, fields in LEGACY_DATE_FIELDS.items():
+        legacy_docs = await db[collection].find(
+            {"$or": [{field: {"$type": "string"}} for field in fields]},
+            dict.fromkeys(fields, 1)
+        ).to_list(None)
+        for doc in legacy_docs:
+            await db[collection].update_one({"_id": doc["_id"]}, {"$set": {
+                field: datetime.fromisoformat(doc[field])
+                for field in fields if isinstance(doc.get(field), str)
+            }})
+    
+    # Messages are listed by session_id and expired via expires_at, which
+    # older messages did not store
+    missing = {"$or": [{"session_id": {"$exists": False}}, {"expires_at": {"$exists": False}}]}
+    addresses = await db.email_messages.distinct("to_email", missing)
+    for address in addresses:
+        email_doc = await db.temp_emails.find_one(
+            {"email_address": address},
+            {"session_id": 1, "expires_at": 1, "_id": 0}
+        )
+        if email_doc:
+            await db.email_messages.update_many(
+                {"to_email": address, **missing},
+                {"$set": {"session_id": email_doc["session_id"], "expires_at": email_doc["expires_at"]}}
+            )
+
 # ============ USER ENDPOINTS ============
 
 @api_router.post("/verify-code", response_model=VerifyCodeResponse)
@@ -178,46 +352,49 @@ async def verify_code(request: VerifyCodeRequest, req: Request):
     code = request.code.upper().strip()
     client_ip = get_client_ip(req)
     
-    # Find the code
-    code_doc = await db.access_codes.find_one({"code": code}, {"_id": 0})
-    
-    if not code_doc:
+    # Reject malformed codes without touching the database
+    if not _CODE_RE.fullmatch(code):
         raise HTTPException(status_code=400, detail="Invalid access code")
     
-    # Check if expired
-    expires_at = datetime.fromisoformat(code_doc["expires_at"])
-    if datetime.now(timezone.utc) > expires_at:
-        raise HTTPException(status_code=400, detail="This code has expired")
+    now = datetime.now(timezone.utc)
+    
+    # Atomically claim the code for this IP: it must be unexpired and either
+    # already used by this IP or still below the 2 IP limit
+    code_doc = await db.access_codes.find_one_and_update(
+        {
+            "code": code,
+            "expires_at": {"$gt": now},
+            "$or": [{"used_ips": client_ip}, {"used_ips.1": {"$exists": False}}]
+        },
+        [{"$set": {
+            "used": True,
+            "used_at": {"$ifNull": ["$used_at", now]},
+            "used_ips": {"$setUnion": [{"$ifNull": ["$used_ips", []]}, [client_ip]]}
+        }}],
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
     
-    # Get list of IPs that have used this code
-    used_ips = code_doc.get("used_ips", [])
+    if not code_doc:
+        # Only look the code up again to report why it was rejected
+        code_doc = await db.access_codes.find_one({"code": code}, {"_id": 0, "expires_at": 1})
+        if not code_doc:
+            raise HTTPException(status_code=400, detail="Invalid access code")
+        if code_doc["expires_at"] <= now:
+            raise HTTPException(status_code=400, detail="This code has expired")
+        raise HTTPException(status_code=403, detail="Different IP address. This code has already been used by 2 different IP addresses.")
     
-    # Check if current IP is already in the list
-    if client_ip not in used_ips:
-        # Check if we've reached the 2 IP limit
-        if len(used_ips) >= 2:
-            raise HTTPException(status_code=403, detail="Different IP address. This code has already been used by 2 different IP addresses.")
-        
-        # Add this IP to the list
-        used_ips.append(client_ip)
-        await db.access_codes.update_one(
-            {"code": code},
-            {
-                "$set": {"used_ips": used_ips},
-                "$setOnInsert": {"first_used_at": datetime.now(timezone.utc).isoformat()}
-            },
-            upsert=False
-        )
+    expires_at = code_doc["expires_at"]
     
     # Check if this IP already has a session for this code
     existing_email = await db.temp_emails.find_one({
         "session_id": code_doc["id"],
         "client_ip": client_ip
-    }, {"_id": 0})
+    }, {"email_address": 1, "_id": 0})
     
     if existing_email:
         # Return existing session
-        remaining_time = expires_at - datetime.now(timezone.utc)
+        remaining_time = expires_at - now
         token = create_token(
             {"sub": code_doc["id"], "email": existing_email["email_address"], "role": "user", "ip": client_ip},
             remaining_time
@@ -238,12 +415,12 @@ async def verify_code(request: VerifyCodeRequest, req: Request):
         "email_address": email_address,
         "session_id": code_doc["id"],
         "client_ip": client_ip,
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": now,
         "expires_at": code_doc["expires_at"]
     })
     
     # Create session token (expires when code expires)
-    remaining_time = expires_at - datetime.now(timezone.utc)
+    remaining_time = expires_at - now
     token = create_token(
         {"sub": code_doc["id"], "email": email_address, "role": "user", "ip": client_ip},
         remaining_time
@@ -270,44 +447,35 @@ async def generate_new_email(user = Depends(get_current_user)):
         "id": email_id,
         "email_address": email_address,
         "session_id": user["sub"],
-        "created_at": created_at.isoformat(),
-        "expires_at": expires_at.isoformat()
+        "created_at": created_at,
+        "expires_at": expires_at
     })
     
     return TempEmailResponse(
         id=email_id,
         email_address=email_address,
-        created_at=created_at.isoformat(),
-        expires_at=expires_at.isoformat()
+        created_at=created_at,
+        expires_at=expires_at
     )
 
-@api_router.get("/emails", response_model=List[TempEmailResponse])
+@api_router.get("/emails")
 async def get_my_emails(user = Depends(get_current_user)):
     """Get all temp emails for current session"""
     emails = await db.temp_emails.find(
         {"session_id": user["sub"]},
-        {"_id": 0}
+        TEMP_EMAIL_PROJECTION
     ).to_list(100)
-    return emails
+    return ORJSONResponse(emails)
 
-@api_router.get("/messages", response_model=List[EmailMessageResponse])
+@api_router.get("/messages")
 async def get_messages(user = Depends(get_current_user)):
     """Get all messages for user's email addresses"""
-    # Get user's email addresses
-    emails = await db.temp_emails.find(
-        {"session_id": user["sub"]},
-        {"email_address": 1, "_id": 0}
-    ).to_list(100)
-    
-    email_addresses = [e["email_address"] for e in emails]
-    
-    # Get messages for these emails
     messages = await db.email_messages.find(
-        {"to_email": {"$in": email_addresses}},
-        {"_id": 0}
+        {"session_id": user["sub"]},
+        EMAIL_MESSAGE_PROJECTION
     ).sort("received_at", -1).to_list(100)
     
-    return messages
+    return ORJSONResponse(messages)
 
 @api_router.get("/messages/{message_id}", response_model=EmailMessageResponse)
 async def get_message(message_id: str, user = Depends(get_current_user)):
@@ -316,12 +484,13 @@ async def get_message(message_id: str, user = Depends(get_current_user)):
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    # Mark as read
-    await db.email_messages.update_one(
-        {"id": message_id},
-        {"$set": {"is_read": True}}
-    )
-    message["is_read"] = True
+    # Mark as read (only written on the first open)
+    if not message.get("is_read"):
+        await db.email_messages.update_one(
+            {"id": message_id, "is_read": {"$ne": True}},
+            {"$set": {"is_read": True}}
+        )
+        message["is_read"] = True
     
     return message
 
@@ -340,7 +509,8 @@ async def admin_login(request: AdminLoginRequest):
     """Admin login"""
     admin = await db.admin_users.find_one({"username": request.username}, {"_id": 0})
     
-    if not admin or not pwd_context.verify(request.password, admin["password_hash"]):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not admin or not await asyncio.to_thread(pwd_context.verify, request.password, admin["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_token(
@@ -353,38 +523,64 @@ async def admin_login(request: AdminLoginRequest):
 @api_router.post("/admin/generate-code", response_model=AccessCodeResponse)
 async def generate_access_code(request: GenerateCodeRequest, admin = Depends(get_admin_user)):
     """Generate a new access code"""
-    code_id = str(uuid.uuid4())
-    code = generate_code()
     created_at = datetime.now(timezone.utc)
-    expires_at = created_at + timedelta(hours=request.expiry_hours)
     
-    code_doc = {
-        "id": code_id,
-        "code": code,
-        "expires_at": expires_at.isoformat(),
-        "used": False,
-        "used_at": None,
-        "used_ips": [],
-        "created_at": created_at.isoformat(),
-        "created_by": admin["username"]
-    }
-    
-    await db.access_codes.insert_one(code_doc)
+    # Draw a fresh code if it collides with an existing one
+    for _ in range(CODE_INSERT_ATTEMPTS):
+        code_doc = build_code_doc(created_at, request.expiry_hours, admin["username"])
+        try:
+            await db.access_codes.insert_one(code_doc)
+        except DuplicateKeyError:
+            continue
+        return AccessCodeResponse(**code_doc)
     
-    return AccessCodeResponse(
-        id=code_id,
-        code=code,
-        expires_at=expires_at.isoformat(),
-        used=False,
-        used_at=None,
-        created_at=created_at.isoformat()
-    )
+    raise HTTPException(status_code=500, detail="Could not generate a unique access code")
 
-@api_router.get("/admin/codes", response_model=List[AccessCodeResponse])
-async def get_all_codes(admin = Depends(get_admin_user)):
-    """Get all access codes"""
-    codes = await db.access_codes.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return codes
+@api_router.post("/admin/generate-codes", response_model=List[AccessCodeResponse])
+async def generate_access_codes(request: GenerateCodesRequest, admin = Depends(get_admin_user)):
+    """Generate several access codes in a single write"""
+    created_at = datetime.now(timezone.utc)
+    code_docs = [
+        build_code_doc(created_at, request.expiry_hours, admin["username"])
+        for _ in range(request.count)
+    ]
+    
+    # Unordered inserts store every non-colliding code, so only regenerate the
+    # codes that hit the unique index
+    stored_docs = []
+    for _ in range(CODE_INSERT_ATTEMPTS):
+        try:
+            await db.access_codes.insert_many(code_docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            collided = {error["index"] for error in write_errors}
+            stored_docs.extend(doc for i, doc in enumerate(code_docs) if i not in collided)
+            code_docs = [
+                build_code_doc(created_at, request.expiry_hours, admin["username"])
+                for _ in collided
+            ]
+        else:
+            stored_docs.extend(code_docs)
+            break
+    else:
+        logging.warning("Generated %d of %d access codes; the rest kept colliding", len(stored_docs), request.count)
+    
+    return [AccessCodeResponse(**code_doc) for code_doc in stored_docs]
+
+@api_router.get("/admin/codes")
+async def get_all_codes(
+    admin = Depends(get_admin_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Get a page of access codes, newest first"""
+    # Codes from one batch share created_at, so id breaks ties to keep pages stable
+    codes = await db.access_codes.find({}, ACCESS_CODE_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).skip(skip).limit(limit).to_list(limit)
+    return ORJSONResponse(codes)
 
 @api_router.delete("/admin/codes/{code_id}")
 async def revoke_code(code_id: str, admin = Depends(get_admin_user)):
@@ -397,20 +593,31 @@ async def revoke_code(code_id: str, admin = Depends(get_admin_user)):
 @api_router.get("/admin/stats", response_model=StatsResponse)
 async def get_stats(admin = Depends(get_admin_user)):
     """Get admin dashboard statistics"""
-    now = datetime.now(timezone.utc).isoformat()
-    
-    total_codes = await db.access_codes.count_documents({})
-    used_codes = await db.access_codes.count_documents({"used": True})
-    
-    # Get expired but unused codes
-    expired_codes = await db.access_codes.count_documents({
-        "used": False,
-        "expires_at": {"$lt": now}
-    })
+    now = datetime.now(timezone.utc)
+    
+    # Count total, used and expired-but-unused codes in a single pass
+    pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "used": [{"$match": {"used": True}}, {"$count": "n"}],
+        "expired": [{"$match": {"used": False, "expires_at": {"$lt": now}}}, {"$count": "n"}],
+    }}]
+    
+    async def count_codes():
+        cursor = await db.access_codes.aggregate(pipeline)
+        return (await cursor.to_list(1))[0]
+    
+    code_counts, total_emails, total_messages = await asyncio.gather(
+        count_codes(),
+        db.temp_emails.count_documents({}),
+        db.email_messages.count_documents({})
+    )
     
+    # $count emits no document for an empty facet
+    total_codes, used_codes, expired_codes = (
+        code_counts[key][0]["n"] if code_counts[key] else 0
+        for key in ("total", "used", "expired")
+    )
     active_codes = total_codes - used_codes - expired_codes
-    total_emails = await db.temp_emails.count_documents({})
-    total_messages = await db.email_messages.count_documents({})
     
     return StatsResponse(
         total_codes=total_codes,
@@ -436,8 +643,8 @@ async def receive_mock_email(request: MockEmailRequest):
         raise HTTPException(status_code=404, detail="Email address not found")
     
     # Check if email is expired
-    expires_at = datetime.fromisoformat(email_doc["expires_at"])
-    if datetime.now(timezone.utc) > expires_at:
+    now = datetime.now(timezone.utc)
+    if now > email_doc["expires_at"]:
         raise HTTPException(status_code=400, detail="Email address has expired")
     
     # Store the message
@@ -445,10 +652,12 @@ async def receive_mock_email(request: MockEmailRequest):
     message_doc = {
         "id": message_id,
         "to_email": request.to_email,
+        "session_id": email_doc["session_id"],
         "from_email": request.from_email,
         "subject": request.subject,
         "body": request.body,
-        "received_at": datetime.now(timezone.utc).isoformat(),
+        "received_at": now,
+        "expires_at": email_doc["expires_at"],
         "is_read": False
     }
     
@@ -480,4 +689,4 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await client.close()
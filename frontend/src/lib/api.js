@@ -58,7 +58,8 @@ export const adminLogin = (username, password) =>
   api.post('/admin/login', { username, password });
 export const generateCode = (expiryHours = 12) => 
   api.post('/admin/generate-code', { expiry_hours: expiryHours });
-export const getCodes = () => api.get('/admin/codes');
+export const getCodes = (skip = 0, limit = 50) => 
+  api.get('/admin/codes', { params: { skip, limit } });
 export const revokeCode = (id) => api.delete(`/admin/codes/${id}`);
 export const getStats = () => api.get('/admin/stats');
 
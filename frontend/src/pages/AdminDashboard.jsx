@@ -4,7 +4,7 @@ import { toast } from 'sonner';
 import { 
   Shield, Plus, Trash2, Copy, LogOut, RefreshCw, 
   Key, Users, Mail, Clock, Check, Loader2, 
-  TicketCheck, TicketX, AlertCircle
+  TicketCheck, TicketX, AlertCircle, ChevronLeft, ChevronRight
 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
@@ -40,9 +40,12 @@ import {
 } from '@/components/ui/alert-dialog';
 import { getStats, getCodes, generateCode, revokeCode } from '@/lib/api';
 
+const CODES_PAGE_SIZE = 50;
+
 export default function AdminDashboard() {
   const [stats, setStats] = useState(null);
   const [codes, setCodes] = useState([]);
+  const [page, setPage] = useState(0);
   const [loading, setLoading] = useState(true);
   const [generating, setGenerating] = useState(false);
   const [generateDialogOpen, setGenerateDialogOpen] = useState(false);
@@ -68,7 +71,7 @@ export default function AdminDashboard() {
     try {
       const [statsRes, codesRes] = await Promise.all([
         getStats(),
-        getCodes()
+        getCodes(page * CODES_PAGE_SIZE, CODES_PAGE_SIZE)
       ]);
       setStats(statsRes.data);
       setCodes(codesRes.data);
@@ -83,7 +86,7 @@ export default function AdminDashboard() {
     } finally {
       setLoading(false);
     }
-  }, [navigate]);
+  }, [navigate, page]);
 
   useEffect(() => {
     fetchData();
@@ -94,7 +97,10 @@ export default function AdminDashboard() {
     try {
       const response = await generateCode(expiryHours);
       setNewCode(response.data);
-      setCodes([response.data, ...codes]);
+      // New codes are the newest, so they only belong on the first page
+      if (page === 0) {
+        setCodes([response.data, ...codes].slice(0, CODES_PAGE_SIZE));
+      }
       setStats(prev => prev ? {
         ...prev,
         total_codes: prev.total_codes + 1,
@@ -114,7 +120,12 @@ export default function AdminDashboard() {
     
     try {
       await revokeCode(codeToDelete.id);
-      setCodes(codes.filter(c => c.id !== codeToDelete.id));
+      const remainingCodes = codes.filter(c => c.id !== codeToDelete.id);
+      setCodes(remainingCodes);
+      // Step back when the last code on a later page is revoked
+      if (remainingCodes.length === 0 && page > 0) {
+        setPage(page - 1);
+      }
       setStats(prev => prev ? {
         ...prev,
         total_codes: prev.total_codes - 1,
@@ -158,6 +169,8 @@ export default function AdminDashboard() {
     return new Date(dateStr).toLocaleString();
   };
 
+  const totalPages = Math.max(1, Math.ceil((stats?.total_codes || 0) / CODES_PAGE_SIZE));
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -376,6 +389,35 @@ export default function AdminDashboard() {
                 </Table>
               )}
             </ScrollArea>
+            {totalPages > 1 && (
+              <div className="flex items-center justify-between pt-4" data-testid="codes-pagination">
+                <p className="text-sm text-muted-foreground">
+                  Page {page + 1} of {totalPages}
+                </p>
+                <div className="flex items-center gap-2">
+                  <Button
+                    data-testid="codes-prev-page-btn"
+                    variant="ghost"
+                    size="sm"
+                    disabled={page === 0}
+                    onClick={() => setPage(page - 1)}
+                  >
+                    <ChevronLeft className="w-4 h-4 mr-1" />
+                    Previous
+                  </Button>
+                  <Button
+                    data-testid="codes-next-page-btn"
+                    variant="ghost"
+                    size="sm"
+                    disabled={page + 1 >= totalPages}
+                    onClick={() => setPage(page + 1)}
+                  >
+                    Next
+                    <ChevronRight className="w-4 h-4 ml-1" />
+                  </Button>
+                </div>
+              </div>
+            )}
           </CardContent>
         </Card>
       </main>
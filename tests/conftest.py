@@ -0,0 +1,72 @@
+import sys
+from datetime import timezone
+from pathlib import Path
+
+import mongomock
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+class AsyncCursor:
+    """Async facade over a mongomock cursor, mirroring PyMongo's AsyncCursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+
+class AsyncCollection:
+    """Async facade over a mongomock collection, mirroring PyMongo's AsyncCollection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self._collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self._database[name])
+
+    __getattr__ = __getitem__
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """In-memory database patched into the server; yields the sync handle for setup and assertions"""
+    database = mongomock.MongoClient(tz_aware=True, tzinfo=timezone.utc).db
+    monkeypatch.setattr(server, "db", AsyncDatabase(database))
+    yield database
@@ -0,0 +1,28 @@
+import asyncio
+from datetime import datetime, timezone
+
+import orjson
+
+import server
+
+ADMIN = {"username": "admin@botsmith.com", "role": "admin"}
+
+
+def get_page(skip, limit):
+    response = asyncio.run(server.get_all_codes(ADMIN, skip=skip, limit=limit))
+    return orjson.loads(response.body)
+
+
+def test_pages_cover_codes_with_tied_created_at(mongo):
+    created_at = datetime.now(timezone.utc)
+    mongo.access_codes.insert_many([
+        dict(server.build_code_doc(created_at, server.CODE_EXPIRY_HOURS, ADMIN["username"]))
+        for _ in range(7)
+    ])
+
+    pages = [get_page(skip, 3) for skip in (0, 3, 6)]
+
+    ids = [code["id"] for page in pages for code in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert ids == sorted(ids, reverse=True)
+    assert set(pages[0][0]) == set(server.AccessCodeResponse.model_fields)
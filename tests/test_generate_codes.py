@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timezone
+from itertools import chain, repeat
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+ADMIN = {"username": "admin@botsmith.com", "role": "admin"}
+
+
+@pytest.fixture
+def code_sequence(monkeypatch):
+    """Make generate_code return the given codes in order"""
+    def use(codes):
+        it = iter(codes)
+        monkeypatch.setattr(server, "generate_code", lambda: next(it))
+    return use
+
+
+@pytest.fixture
+def existing_code(mongo):
+    mongo.access_codes.create_index("code", unique=True)
+    mongo.access_codes.insert_one({"id": "existing", "code": "TAKEN000", "created_at": datetime.now(timezone.utc)})
+    return "TAKEN000"
+
+
+def generate_batch(count):
+    request = server.GenerateCodesRequest(count=count)
+    return asyncio.run(server.generate_access_codes(request, ADMIN))
+
+
+def test_batch_regenerates_collided_codes(mongo, existing_code, code_sequence):
+    code_sequence(["AAAA0001", existing_code, "AAAA0003", "AAAA0002"])
+
+    codes = generate_batch(3)
+
+    assert sorted(c.code for c in codes) == ["AAAA0001", "AAAA0002", "AAAA0003"]
+    assert mongo.access_codes.count_documents({}) == 4
+
+
+def test_batch_returns_only_stored_codes_when_retries_run_out(mongo, existing_code, code_sequence):
+    code_sequence(chain(["AAAA0001"], repeat(existing_code)))
+
+    codes = generate_batch(2)
+
+    assert [c.code for c in codes] == ["AAAA0001"]
+    assert mongo.access_codes.count_documents({}) == 2
+
+
+def test_single_code_regenerates_on_collision(mongo, existing_code, code_sequence):
+    code_sequence([existing_code, "AAAA0001"])
+
+    code = asyncio.run(server.generate_access_code(server.GenerateCodeRequest(), ADMIN))
+
+    assert code.code == "AAAA0001"
+
+
+def test_single_code_gives_up_after_repeated_collisions(mongo, existing_code, code_sequence):
+    code_sequence(repeat(existing_code))
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(server.generate_access_code(server.GenerateCodeRequest(), ADMIN))
+
+    assert exc_info.value.status_code == 500
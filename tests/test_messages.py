@@ -0,0 +1,17 @@
+import asyncio
+
+import pytest
+
+import server
+
+USER = {"sub": "session", "role": "user"}
+
+
+@pytest.mark.parametrize("stored", [{"is_read": False}, {}], ids=["unread", "missing is_read"])
+def test_opening_a_message_marks_it_read(mongo, stored):
+    mongo.email_messages.insert_one({"id": "m1", **stored})
+
+    message = asyncio.run(server.get_message("m1", USER))
+
+    assert message["is_read"] is True
+    assert mongo.email_messages.find_one({"id": "m1"})["is_read"] is True
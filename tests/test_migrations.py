@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timezone
+
+import server
+
+
+def test_backfills_message_session_and_expiry(mongo):
+    expires_at = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    mongo.temp_emails.insert_one({
+        "email_address": "a@tempmail.local",
+        "session_id": "session-a",
+        "expires_at": "2025-01-02T00:00:00+00:00",
+    })
+    mongo.email_messages.insert_many([
+        {"id": "m1", "to_email": "a@tempmail.local"},
+        {"id": "m2", "to_email": "a@tempmail.local", "session_id": "session-a", "expires_at": expires_at},
+        {"id": "m3", "to_email": "gone@tempmail.local"},
+    ])
+
+    asyncio.run(server.migrate_legacy_documents())
+    asyncio.run(server.migrate_legacy_documents())
+
+    messages = {m["id"]: (m.get("session_id"), m.get("expires_at")) for m in mongo.email_messages.find()}
+    assert messages == {
+        "m1": ("session-a", expires_at),
+        "m2": ("session-a", expires_at),
+        "m3": (None, None),
+    }
+
+
+def test_converts_string_timestamps(mongo):
+    mongo.access_codes.insert_many([
+        {
+            "id": "legacy",
+            "expires_at": "2025-01-02T03:04:05.678000+00:00",
+            "created_at": "2025-01-01T03:04:05+00:00",
+            "used_at": None,
+        },
+        {
+            "id": "current",
+            "expires_at": datetime(2025, 1, 2, tzinfo=timezone.utc),
+            "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+            "used_at": None,
+        },
+    ])
+
+    asyncio.run(server.migrate_legacy_documents())
+    asyncio.run(server.migrate_legacy_documents())
+
+    legacy = mongo.access_codes.find_one({"id": "legacy"})
+    assert legacy["expires_at"] == datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    assert legacy["created_at"] == datetime(2025, 1, 1, 3, 4, 5, tzinfo=timezone.utc)
+    assert legacy["used_at"] is None
+    current = mongo.access_codes.find_one({"id": "current"})
+    assert current["expires_at"] == datetime(2025, 1, 2, tzinfo=timezone.utc)
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import hmac
+from datetime import timedelta
+
+import jwt
+import orjson
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def sign(header_segment: str, payload_segment: str) -> str:
+    """Assemble a token with a valid HS256 signature over arbitrary segments"""
+    signing_input = f"{header_segment}.{payload_segment}"
+    signature = hmac.new(server.JWT_SECRET_KEY, signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+
+def with_payload(payload: dict) -> str:
+    return jwt.encode(payload, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+
+
+def tamper_signature(token: str) -> str:
+    signing_input, _, signature = token.rpartition(".")
+    flipped = "A" if signature[5] != "A" else "B"
+    return f"{signing_input}.{signature[:5]}{flipped}{signature[6:]}"
+
+
+HEADER = b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+VALID_PAYLOAD = {"sub": "session", "role": "user"}
+
+# Every way a token can be invalid other than expiry, with the error decode_token raises
+INVALID_TOKENS = {
+    "tampered signature": (
+        lambda: tamper_signature(server.create_token(VALID_PAYLOAD, timedelta(minutes=5))),
+        jwt.InvalidSignatureError,
+    ),
+    "wrong secret": (
+        lambda: jwt.encode({"exp": 9999999999}, "another-secret-of-sufficient-length!", algorithm="HS256"),
+        jwt.InvalidSignatureError,
+    ),
+    "alg none": (
+        lambda: f"{b64url(orjson.dumps({'alg': 'none'}))}.{b64url(orjson.dumps({'exp': 9999999999}))}.",
+        jwt.InvalidAlgorithmError,
+    ),
+    "alg HS512": (
+        lambda: jwt.encode({"exp": 9999999999}, server.JWT_SECRET, algorithm="HS512"),
+        jwt.InvalidAlgorithmError,
+    ),
+    "missing exp": (lambda: with_payload({"sub": "session"}), jwt.MissingRequiredClaimError),
+    "string exp": (lambda: with_payload({"exp": "tomorrow"}), jwt.MissingRequiredClaimError),
+    "boolean exp": (lambda: with_payload({"exp": True}), jwt.MissingRequiredClaimError),
+    "non-object payload": (lambda: sign(HEADER, b64url(b"[1, 2]")), jwt.MissingRequiredClaimError),
+    "empty": (lambda: "", jwt.DecodeError),
+    "one segment": (lambda: "abc", jwt.DecodeError),
+    "two segments": (lambda: "abc.def", jwt.DecodeError),
+    "four segments": (lambda: "a.b.c.d", jwt.DecodeError),
+    "non-base64 header": (lambda: "!!!.e30.abc", jwt.DecodeError),
+    "non-ascii segments": (lambda: "é.é.é", jwt.DecodeError),
+    "non-ascii payload": (lambda: sign(HEADER, "é"), jwt.DecodeError),
+    "non-json payload": (lambda: sign(HEADER, b64url(b"not json")), jwt.DecodeError),
+}
+
+
+def test_create_token_round_trips():
+    token = server.create_token(VALID_PAYLOAD, timedelta(minutes=5))
+
+    payload = server.decode_token(token)
+
+    assert payload["sub"] == "session"
+    assert payload["role"] == "user"
+    assert payload == jwt.decode(token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM])
+
+
+@pytest.mark.parametrize("make_token, error", INVALID_TOKENS.values(), ids=INVALID_TOKENS.keys())
+def test_invalid_tokens_are_rejected(make_token, error):
+    with pytest.raises(error):
+        server.decode_token(make_token())
+
+
+@pytest.mark.parametrize("make_token, error", INVALID_TOKENS.values(), ids=INVALID_TOKENS.keys())
+def test_verify_token_reports_invalid_tokens(make_token, error):
+    assert issubclass(error, jwt.InvalidTokenError)
+    assert not issubclass(error, jwt.ExpiredSignatureError)
+
+    with pytest.raises(HTTPException) as exc_info:
+        server.verify_token(make_token())
+
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid token"
+
+
+def test_expired_token_is_rejected():
+    token = server.create_token(VALID_PAYLOAD, timedelta(seconds=-1))
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        server.decode_token(token)
+    with pytest.raises(HTTPException) as exc_info:
+        server.verify_token(token)
+
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Session expired"
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+
+def make_request(ip: str) -> Request:
+    return Request({"type": "http", "headers": [], "client": (ip, 50000)})
+
+
+def verify(code: str, ip: str) -> server.VerifyCodeResponse:
+    return asyncio.run(server.verify_code(server.VerifyCodeRequest(code=code), make_request(ip)))
+
+
+def insert_code(mongo, created_at=None, expiry_hours=server.CODE_EXPIRY_HOURS) -> dict:
+    code_doc = server.build_code_doc(
+        created_at or datetime.now(timezone.utc), expiry_hours, "admin@botsmith.com"
+    )
+    mongo.access_codes.insert_one(dict(code_doc))
+    return code_doc
+
+
+def test_same_ip_redeems_twice(mongo):
+    code_doc = insert_code(mongo)
+
+    first = verify(code_doc["code"], "10.0.0.1")
+    second = verify(code_doc["code"].lower(), "10.0.0.1")
+
+    assert first.email_address == second.email_address
+    stored = mongo.access_codes.find_one({"id": code_doc["id"]})
+    assert stored["used_ips"] == ["10.0.0.1"]
+    assert stored["used"] is True
+    assert stored["used_at"] is not None
+    assert mongo.temp_emails.count_documents({"session_id": code_doc["id"]}) == 1
+
+
+def test_second_ip_is_accepted(mongo):
+    code_doc = insert_code(mongo)
+
+    first = verify(code_doc["code"], "10.0.0.1")
+    used_at = mongo.access_codes.find_one({"id": code_doc["id"]})["used_at"]
+    second = verify(code_doc["code"], "10.0.0.2")
+
+    assert first.email_address != second.email_address
+    stored = mongo.access_codes.find_one({"id": code_doc["id"]})
+    assert sorted(stored["used_ips"]) == ["10.0.0.1", "10.0.0.2"]
+    assert stored["used_at"] == used_at
+
+
+def test_third_ip_is_rejected(mongo):
+    code_doc = insert_code(mongo)
+    verify(code_doc["code"], "10.0.0.1")
+    verify(code_doc["code"], "10.0.0.2")
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify(code_doc["code"], "10.0.0.3")
+
+    assert exc_info.value.status_code == 403
+    stored = mongo.access_codes.find_one({"id": code_doc["id"]})
+    assert sorted(stored["used_ips"]) == ["10.0.0.1", "10.0.0.2"]
+
+
+def test_expired_code_is_rejected(mongo):
+    code_doc = insert_code(mongo, created_at=datetime.now(timezone.utc) - timedelta(hours=2), expiry_hours=1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify(code_doc["code"], "10.0.0.1")
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "This code has expired"
+    assert mongo.access_codes.find_one({"id": code_doc["id"]})["used"] is False
+
+
+@pytest.mark.parametrize("code", ["ZZZZZZZZ", "not-a-code"])
+def test_unknown_code_is_rejected(mongo, code):
+    insert_code(mongo)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify(code, "10.0.0.1")
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Invalid access code"